@@ -1,177 +1,293 @@
-import streamlit as st
+from collections import namedtuple
+from pathlib import Path
 import sqlite3
+import streamlit as st
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import altair as alt
 
 # --- Altair setup: avoid 5k row error and ensure Altair is ready ---
 alt.data_transformers.disable_max_rows()
 
-DB_PATH = "baseball.db"
+DATA_DIR = Path("data")  # Parquet files written by import_csvs.py
+DB_PATH = "baseball.db"  # SQLite copy, used for indexed per-player lookups
+HR_TOP_N = 50  # bars shown in the home-run chart; the table below lists everyone
 
 EXPECTED = {
     "batting_avg": ["Name", "Team", "Year", "Batting_Average"],
     "home_runs": ["Name", "Career_Home_Runs"],
     "career_strikeouts": ["Name", "League", "Career_Strikeouts"],
+    "players": ["Name"],  # precomputed by import_csvs.py
 }
 
-def read_table(conn, table, cols):
-    """Read a table if it exists; otherwise return an empty DF with expected columns."""
+# (alias, table, column) joined onto batting_avg in the player view, when the table exists
+PLAYER_STATS = [
+    ("h", "home_runs", "Career_Home_Runs"),
+    ("k", "career_strikeouts", "Career_Strikeouts"),
+]
+
+def parquet_path(table):
+    return DATA_DIR / f"{table}.parquet"
+
+def arrow_dtype(pa_type):
+    """Arrow-backed pandas dtype for a column; None (-> Categorical) for dictionary-encoded labels."""
+    # Arrow-backed columns reach st.dataframe without an Arrow conversion;
+    # labels stay Categoricals because Altair and sorted_options rely on .cat
+    return None if pa.types.is_dictionary(pa_type) else pd.ArrowDtype(pa_type)
+
+def read_table(table, cols):
+    """Read only the expected columns of a table; empty DF with expected columns if missing."""
     try:
-        df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
-        # If the table exists but has different col names, standardize if possible
-        # (light touch: only keep expected columns that are present)
-        present = [c for c in cols if c in df.columns]
-        if present:
-            return df[present]
-        # If nothing matches, return empty with expected schema
-        return pd.DataFrame(columns=cols)
+        # Parquet is columnar: only the requested columns are decoded
+        existing = set(pq.read_schema(parquet_path(table)).names)
+        present = [c for c in cols if c in existing]
+        if not present:
+            # Nothing matches: return empty with expected schema
+            return pd.DataFrame(columns=cols)
+        return pq.read_table(parquet_path(table), columns=present).to_pandas(types_mapper=arrow_dtype)
     except Exception:
         return pd.DataFrame(columns=cols)
 
-def load_data():
-    conn = sqlite3.connect(DB_PATH)
-    batting = read_table(conn, "batting_avg", EXPECTED["batting_avg"])
-    hr = read_table(conn, "home_runs", EXPECTED["home_runs"])
-    k = read_table(conn, "career_strikeouts", EXPECTED["career_strikeouts"])
-    conn.close()
-    return batting, hr, k
+def data_mtime():
+    """Latest modification time of the Parquet files, or None if none exist."""
+    paths = [parquet_path(t) for t in EXPECTED]
+    return max((p.stat().st_mtime for p in paths if p.exists()), default=None)
 
-st.set_page_config(page_title="Baseball Stats Dashboard", layout="wide")
-st.title("⚾ Baseball Stats Dashboard")
+def sorted_options(series):
+    """Sorted distinct non-null values; categoricals answer from their categories without a scan."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return sorted(series.cat.categories)
+    return sorted(series.dropna().unique())
 
-df_batting, df_home_runs, df_career_strikeouts = load_data()
+@st.cache_data(max_entries=1, show_spinner=False)
+def load_data(data_version):
+    """Load all tables once; data_version (the Parquet mtime) keys the cache so a re-import invalidates it."""
+    batting = read_table("batting_avg", EXPECTED["batting_avg"])
+    hr = read_table("home_runs", EXPECTED["home_runs"])
+    if "Career_Home_Runs" in hr.columns:
+        # ascending by home runs so the min-HR slider is a binary search, not a scan
+        hr = hr.dropna(subset=["Career_Home_Runs"]).sort_values("Career_Home_Runs", ignore_index=True)
+    k = read_table("career_strikeouts", EXPECTED["career_strikeouts"])
+    players = read_table("players", EXPECTED["players"])
+    return batting, hr, k, players
 
-# --- Sidebar filters, guarded by data availability ---
-st.sidebar.header("Filters")
+FilterOptions = namedtuple("FilterOptions", ["years", "teams", "leagues", "players"])
 
-# Filters for batting avg
-if not df_batting.empty:
-    all_years = sorted(df_batting["Year"].dropna().unique())
-    all_teams = sorted(df_batting["Team"].dropna().unique())
-    years = st.sidebar.multiselect("Select Year(s)", all_years, default=all_years)
-    teams = st.sidebar.multiselect("Select Team(s)", all_teams, default=all_teams)
-else:
-    years, teams = [], []
+@st.cache_resource(max_entries=1, show_spinner=False)
+def get_filter_options(_df_batting, _df_career_strikeouts, _df_players, data_version):
+    """Sorted widget options for every section, computed once per data version."""
+    def options(df, col):
+        return sorted_options(df[col]) if col in df.columns else []
+    return FilterOptions(
+        years=options(_df_batting, "Year"),
+        teams=options(_df_batting, "Team"),
+        leagues=options(_df_career_strikeouts, "League"),
+        # already sorted at import time
+        players=_df_players["Name"].tolist() if "Name" in _df_players.columns else [],
+    )
 
-# Slider for home runs
-if not df_home_runs.empty and "Career_Home_Runs" in df_home_runs.columns:
-    max_home_runs = int(df_home_runs["Career_Home_Runs"].max())
-    min_home_runs = st.sidebar.slider("Career Home Runs (min)", 0, max_home_runs, min(100, max_home_runs))
-else:
-    min_home_runs = None
-
-# League select
-if not df_career_strikeouts.empty and "League" in df_career_strikeouts.columns:
-    leagues = sorted(df_career_strikeouts["League"].dropna().unique())
-    league = st.sidebar.selectbox("Select League", leagues) if leagues else None
-else:
-    league = None
-
-# --- Chart 1: Batting Average Over Time ---
-st.header("Batting Average Over Time by Team")
-if df_batting.empty:
-    st.info("No batting average data found. Ensure `data/batting_avg.csv` (or DB table) is loaded.")
-else:
-    df_line = df_batting
+def db_mtime():
+    """Modification time of the SQLite file, or None if it doesn't exist."""
+    return Path(DB_PATH).stat().st_mtime if Path(DB_PATH).exists() else None
+
+@st.cache_resource(max_entries=1)
+def get_conn(db_version):
+    """In-memory copy of baseball.db shared by all reruns and sessions; db_version (the file mtime) keys a reload."""
+    # mode=ro: fail instead of creating an empty DB when it hasn't been imported yet
+    src = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    # Streamlit serves sessions from several threads
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    try:
+        src.backup(conn)
+    finally:
+        src.close()
+    return conn
+
+@st.cache_resource(max_entries=1)
+def player_query(db_version):
+    """Per-player join over the stat tables present in baseball.db; missing ones are left out."""
+    conn = get_conn(db_version)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    stats = [stat for stat in PLAYER_STATS if stat[1] in tables]
+    columns = ", ".join(["b.Year", "b.Batting_Average"] + [f"{alias}.{column}" for alias, _, column in stats])
+    joins = "".join(f"LEFT JOIN {table} {alias} USING (Name)\n" for alias, table, _ in stats)
+    return f"SELECT {columns}\nFROM batting_avg b\n{joins}WHERE b.Name = ?"
+
+# Chart builders are cached per data version + filter values, so a rerun with unchanged
+# filters reuses the finished chart instead of re-filtering and re-aggregating.
+# The frame is passed as an unhashed _arg; data_version (the Parquet mtime) keys it.
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def batting_chart(_df_batting, data_version, years, teams):
+    """Mean batting average per (Team, Year) as a line chart; None if no rows match."""
+    # one combined mask -> a single row selection instead of one copy per filter
+    mask = pd.Series(True, index=_df_batting.index)
     if years:
-        df_line = df_line[df_line["Year"].isin(years)]
+        mask &= _df_batting["Year"].isin(years)
     if teams:
-        df_line = df_line[df_line["Team"].isin(teams)]
-
+        mask &= _df_batting["Team"].isin(teams)
+    df_line = _df_batting[mask]
     if df_line.empty:
-        st.info("No rows match the selected Year/Team filters.")
-    else:
-        try:
-            chart = (
-                alt.Chart(df_line)
-                .mark_line(point=True)
-                .encode(
-                    x=alt.X("Year:O", title="Year"),
-                    y=alt.Y("Batting_Average:Q", title="Batting Average"),
-                    color=alt.Color("Team:N", title="Team"),
-                    tooltip=["Name", "Team", "Year", "Batting_Average"]
-                )
-                .properties(width=900, height=400)
-            )
-            st.altair_chart(chart, use_container_width=True)
-        except Exception as e:
-            st.error(f"Could not render batting-average chart: {e}")
-
-# --- Chart 2: Career Home Runs ---
-st.header("Top Career Home Run Hitters")
-if df_home_runs.empty or min_home_runs is None:
-    st.info("No home run data found. Ensure `data/home_runs.csv` (or DB table) is loaded.")
-else:
-    df_hr = df_home_runs[df_home_runs["Career_Home_Runs"] >= min_home_runs]
-    if df_hr.empty:
-        st.info("No players meet the selected minimum career home runs.")
-    else:
-        try:
-            bar = (
-                alt.Chart(df_hr.sort_values("Career_Home_Runs", ascending=False))
-                .mark_bar()
-                .encode(
-                    x=alt.X("Name:N", sort="-y", title="Player"),
-                    y=alt.Y("Career_Home_Runs:Q", title="Career Home Runs"),
-                    tooltip=["Name", "Career_Home_Runs"]
-                )
-                .properties(width=900, height=350)
-            )
-            st.altair_chart(bar, use_container_width=True)
-            st.dataframe(
-                df_hr[["Name","Career_Home_Runs"]]
-                .sort_values("Career_Home_Runs", ascending=False),
-                use_container_width=True
-            )
-        except Exception as e:
-            st.error(f"Could not render home-runs chart: {e}")
-
-# --- Chart 3: Career Strikeouts by League (cumulative) ---
-st.header("Career Strikeouts by League (Cumulative)")
-if df_career_strikeouts.empty or league is None:
-    st.info("No career strikeouts data found. Ensure `data/career_strikeouts.csv` (or DB table) is loaded.")
-else:
-    df_k = df_career_strikeouts[df_career_strikeouts["League"] == league].copy()
+        return None
+    # one point per (Team, Year) keeps the chart payload independent of player count;
+    # sorting first makes "first" the player with the group's best average
+    df_agg = (
+        df_line.sort_values("Batting_Average", ascending=False)
+        .groupby(["Team", "Year"], as_index=False, observed=True)
+        .agg(
+            Batting_Average=("Batting_Average", "mean"),
+            Players=("Name", "nunique"),
+            Top_Player=("Name", "first"),
+        )
+    )
+    return (
+        alt.Chart(df_agg)
+        .mark_line(point=True)
+        .encode(
+            x=alt.X("Year:O", title="Year"),
+            y=alt.Y("Batting_Average:Q", title="Batting Average"),
+            color=alt.Color("Team:N", title="Team"),
+            tooltip=["Team", "Year", "Batting_Average", "Players", "Top_Player"]
+        )
+        .properties(width=900, height=400)
+    )
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def home_runs_chart(_df_hr, data_version, min_home_runs):
+    """Bar chart of the top HR_TOP_N hitters in _df_hr (the players at or above min_home_runs)."""
+    # _df_hr is already in descending order (reversed tail of the sorted frame), so the
+    # top K is its first K rows: no selection or sort needed
+    return (
+        alt.Chart(_df_hr.head(HR_TOP_N))
+        .mark_bar()
+        .encode(
+            x=alt.X("Name:N", sort="-y", title="Player"),
+            y=alt.Y("Career_Home_Runs:Q", title="Career Home Runs"),
+            tooltip=["Name", "Career_Home_Runs"]
+        )
+        .properties(width=900, height=350)
+    )
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def strikeouts_chart(_df_career_strikeouts, data_version, league):
+    """Cumulative career strikeouts for one league as an area chart; None if the league is empty."""
+    df_k = _df_career_strikeouts[_df_career_strikeouts["League"] == league].copy()
     df_k = df_k.sort_values("Career_Strikeouts")
     if df_k.empty:
-        st.info(f"No strikeout data for league '{league}'.")
-    else:
-        df_k["Cumulative"] = df_k["Career_Strikeouts"].cumsum()
-        try:
-            area = (
-                alt.Chart(df_k)
-                .mark_area(opacity=0.5)
-                .encode(
-                    x=alt.X("Name:N", sort=None, title="Player"),
-                    y=alt.Y("Cumulative:Q", title="Cumulative Career Strikeouts"),
-                    tooltip=["Name", "Career_Strikeouts"]
-                )
-                .properties(width=900, height=350)
-            )
-            st.altair_chart(area, use_container_width=True)
-        except Exception as e:
-            st.error(f"Could not render strikeouts chart: {e}")
-
-# --- Combined Stats for a Player ---
-st.header("🔍 Combined Stats for a Player")
-if df_batting.empty:
-    st.info("Load batting data to use the player detail view.")
-else:
-    player_list = sorted(df_batting["Name"].dropna().unique())
-    selected_player = st.selectbox("Select Player", player_list) if player_list else None
-
-    if selected_player:
-        df_combined = df_batting[df_batting["Name"] == selected_player].copy()
-        if not df_home_runs.empty:
-            df_combined = df_combined.merge(df_home_runs, on="Name", how="left")
-        if not df_career_strikeouts.empty:
-            df_combined = df_combined.merge(df_career_strikeouts, on="Name", how="left")
-
-        if df_combined.empty:
-            st.write("No combined stats found for this player.")
-        else:
-            keep_cols = [c for c in ["Year", "Batting_Average", "Career_Home_Runs", "Career_Strikeouts"] if c in df_combined.columns]
-            if "Year" in keep_cols:
-                st.dataframe(df_combined[keep_cols].set_index("Year"), use_container_width=True)
-            else:
-                st.dataframe(df_combined[keep_cols], use_container_width=True)
+        return None
+    # float32 is ample for a plotted running total and halves the bytes cumsum walks
+    df_k["Cumulative"] = np.cumsum(df_k["Career_Strikeouts"].to_numpy(dtype=np.float32, na_value=0))
+    return (
+        alt.Chart(df_k)
+        .mark_area(opacity=0.5)
+        .encode(
+            x=alt.X("Name:N", sort=None, title="Player"),
+            y=alt.Y("Cumulative:Q", title="Cumulative Career Strikeouts"),
+            tooltip=["Name", "Career_Strikeouts"]
+        )
+        .properties(width=900, height=350)
+    )
+
+# Each section is a fragment: its widgets rerun only that section, not the whole page.
+
+@st.fragment
+def render_batting(df_batting, data_version, options):
+    st.header("Batting Average Over Time by Team")
+    if df_batting.empty:
+        st.info("No batting average data found. Ensure `data/batting_avg.csv` has been imported with `import_csvs.py`.")
+        return
+
+    col_years, col_teams = st.columns(2)
+    years = col_years.multiselect("Select Year(s)", options.years, default=options.years)
+    teams = col_teams.multiselect("Select Team(s)", options.teams, default=options.teams)
+
+    try:
+        chart = batting_chart(df_batting, data_version, tuple(years), tuple(teams))
+        if chart is None:
+            st.info("No rows match the selected Year/Team filters.")
+            return
+        st.altair_chart(chart, use_container_width=True)
+    except Exception as e:
+        st.error(f"Could not render batting-average chart: {e}")
+
+@st.fragment
+def render_home_runs(df_home_runs, data_version):
+    st.header("Top Career Home Run Hitters")
+    if df_home_runs.empty or "Career_Home_Runs" not in df_home_runs.columns:
+        st.info("No home run data found. Ensure `data/home_runs.csv` has been imported with `import_csvs.py`.")
+        return
+
+    max_home_runs = int(df_home_runs["Career_Home_Runs"].max())
+    min_home_runs = st.slider("Career Home Runs (min)", 0, max_home_runs, min(100, max_home_runs))
+
+    # df_home_runs is sorted ascending (see load_data): qualifying rows are a tail slice
+    start = df_home_runs["Career_Home_Runs"].searchsorted(min_home_runs)
+    df_hr = df_home_runs.iloc[start:][::-1]
+    if df_hr.empty:
+        st.info("No players meet the selected minimum career home runs.")
+        return
+    try:
+        st.altair_chart(home_runs_chart(df_hr, data_version, min_home_runs), use_container_width=True)
+        st.dataframe(
+            df_hr[["Name","Career_Home_Runs"]],
+            use_container_width=True
+        )
+    except Exception as e:
+        st.error(f"Could not render home-runs chart: {e}")
+
+@st.fragment
+def render_strikeouts(df_career_strikeouts, data_version, options):
+    st.header("Career Strikeouts by League (Cumulative)")
+    if df_career_strikeouts.empty or "League" not in df_career_strikeouts.columns:
+        st.info("No career strikeouts data found. Ensure `data/career_strikeouts.csv` has been imported with `import_csvs.py`.")
+        return
+
+    league = st.selectbox("Select League", options.leagues) if options.leagues else None
+    if league is None:
+        st.info("No leagues found in the career strikeouts data.")
+        return
+
+    try:
+        area = strikeouts_chart(df_career_strikeouts, data_version, league)
+        if area is None:
+            st.info(f"No strikeout data for league '{league}'.")
+            return
+        st.altair_chart(area, use_container_width=True)
+    except Exception as e:
+        st.error(f"Could not render strikeouts chart: {e}")
+
+@st.fragment
+def render_player(options):
+    st.header("🔍 Combined Stats for a Player")
+    if not options.players:
+        st.info("Load batting data to use the player detail view.")
+        return
+
+    selected_player = st.selectbox("Select Player", options.players)
+
+    # indexed join against the in-memory DB: no file IO, only the selected player's rows are read
+    try:
+        db_version = db_mtime()
+        df_combined = pd.read_sql_query(player_query(db_version), get_conn(db_version), params=(selected_player,))
+    except Exception as e:
+        st.error(f"Could not load combined stats: {e}")
+        return
+    if df_combined.empty:
+        st.write("No combined stats found for this player.")
+        return
+    st.dataframe(df_combined.set_index("Year"), use_container_width=True)
+
+st.set_page_config(page_title="Baseball Stats Dashboard", layout="wide")
+st.title("⚾ Baseball Stats Dashboard")
+
+data_version = data_mtime()
+df_batting, df_home_runs, df_career_strikeouts, df_players = load_data(data_version)
+
+options = get_filter_options(df_batting, df_career_strikeouts, df_players, data_version)
+
+render_batting(df_batting, data_version, options)
+render_home_runs(df_home_runs, data_version)
+render_strikeouts(df_career_strikeouts, data_version, options)
+render_player(options)
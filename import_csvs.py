@@ -1,5 +1,11 @@
 from pathlib import Path
+import csv
+import os
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
 import sqlite3
 
 DB_PATH = Path("baseball.db")
@@ -11,36 +17,162 @@ REQUIRED = {
     "career_strikeouts.csv": "career_strikeouts",
 }
 
+# low-cardinality labels are dictionary-encoded (categoricals in pandas): filters compare integer codes
+LABEL = pa.dictionary(pa.int32(), pa.string())
+
 CSV_DTYPES = {
-    "batting_avg": {"Name": str, "Team": str, "Year": "Int64", "Batting_Average": "float"},
-    "home_runs": {"Name": str, "Career_Home_Runs": "Int64"},
-    "career_strikeouts": {"Name": str, "League": str, "Career_Strikeouts": "Int64"},
+    "batting_avg": {"Name": LABEL, "Team": LABEL, "Year": pa.int64(), "Batting_Average": pa.float64()},
+    "home_runs": {"Name": LABEL, "Career_Home_Runs": pa.int64()},
+    "career_strikeouts": {"Name": LABEL, "League": LABEL, "Career_Strikeouts": pa.int64()},
+}
+
+# (table, column) for the Name joins and League filter in query.py
+INDEXES = {
+    "idx_bat_name": ("batting_avg", "Name"),
+    "idx_hr_name": ("home_runs", "Name"),
+    "idx_k_name": ("career_strikeouts", "Name"),
+    "idx_k_league": ("career_strikeouts", "League"),
 }
 
+CHUNK_BYTES = 16 << 20  # CSV bytes parsed per chunk; bounds memory for large files
+
+def normalize_columns(names):
+    """Strip and underscore header names; blank ones (e.g. a to_csv index column) become Unnamed_<i>."""
+    normalized = pd.Index(names).str.strip().str.replace(" ", "_", regex=False)
+    return [name or f"Unnamed_{i}" for i, name in enumerate(normalized)]
+
+def parquet_path(table_name):
+    """Columnar copy of a table for the dashboard; baseball.db stays for query.py."""
+    return CSV_DIR / f"{table_name}.parquet"
+
+def to_number(column, typ):
+    """Parse a text column as typ; cells that don't parse, or don't fit typ exactly, become null."""
+    numbers = pa.array(pd.to_numeric(column.to_pandas(), errors="coerce").astype("float64"), from_pandas=True)
+    if pa.types.is_integer(typ):
+        # integral, in-range values ('1901.0') convert; '1901.7' or '1e20' become null
+        fits = pc.and_(
+            pc.equal(pc.floor(numbers), numbers),
+            pc.and_(pc.greater_equal(numbers, -(2.0 ** 63)), pc.less(numbers, 2.0 ** 63)),
+        )
+        numbers = pc.if_else(fits, numbers, pa.scalar(None, pa.float64()))
+    return pc.cast(numbers, typ)
+
+def stream_csv(csv_path, table, names, declared, column_types, coerce, conn, parquet_file):
+    """Stream csv_path into SQLite table and parquet_file; columns indexed in coerce are parsed with to_number."""
+    reader = pv.open_csv(
+        csv_path,
+        read_options=pv.ReadOptions(block_size=CHUNK_BYTES),
+        convert_options=pv.ConvertOptions(column_types=column_types),
+    )
+    schema = pa.schema([
+        pa.field(name, declared[name] if i in coerce else field.type)
+        for i, (field, name) in enumerate(zip(reader.schema, names))
+    ])
+    # create the table with the right columns, then append each chunk as it is parsed
+    schema.empty_table().to_pandas().to_sql(table, conn, if_exists="replace", index=False)
+    rows = 0
+    with pq.ParquetWriter(parquet_file, schema, compression="zstd") as writer:
+        for batch in reader:
+            columns = [
+                to_number(column, schema.field(i).type) if i in coerce else column
+                for i, column in enumerate(batch.columns)
+            ]
+            chunk = pa.RecordBatch.from_arrays(columns, schema=schema)
+            writer.write_batch(chunk)
+            chunk.to_pandas().to_sql(table, conn, if_exists="append", index=False)
+            rows += chunk.num_rows
+    return rows
+
 def import_one(csv_name, table_name, conn):
+    """Stream a CSV into SQLite and Parquet chunk by chunk; returns the Parquet path, or None if skipped/failed."""
     csv_path = CSV_DIR / csv_name
     if not csv_path.exists():
         print(f"⚠️  Skipping {table_name}: CSV not found at {csv_path}")
-        return
-    df = pd.read_csv(csv_path)
-    # normalize column names
-    df.columns = [c.strip().replace(" ", "_") for c in df.columns]
-    # apply dtypes if declared
-    if table_name in CSV_DTYPES:
-        for col, typ in CSV_DTYPES[table_name].items():
-            if col in df.columns:
-                df[col] = df[col].astype(typ, errors="ignore")
+        return None
+    # declared types are keyed by normalized name, so match them against the normalized header
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), [])
+    names = normalize_columns(header)
+    declared = CSV_DTYPES.get(table_name, {})
+    # fast path types, plus a fallback for when a declared numeric column has cells Arrow
+    # can't decode ('1901.0', 'abc'): read those columns as text and coerce with to_number
+    column_types, tolerant_types, numeric = {}, {}, set()
+    for i, (raw, name) in enumerate(zip(header, names)):
+        typ = declared.get(name)
+        if typ is None:
+            # undeclared columns stay text: the streaming reader would otherwise fix their
+            # type from the first block and abort on a later block that doesn't fit
+            typ = pa.string()
+        elif not pa.types.is_dictionary(typ):
+            numeric.add(i)
+        column_types[raw] = typ
+        tolerant_types[raw] = pa.string() if i in numeric else typ
+
+    # Load into a staging table and a temp Parquet file; the live copies are swapped in only
+    # once the whole CSV has parsed, so a bad row can't leave them truncated.
+    staging = f"{table_name}__staging"
+    path = parquet_path(table_name)
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        try:
+            # fast path: typed decoding inside Arrow's reader
+            rows = stream_csv(csv_path, staging, names, declared, column_types, set(), conn, tmp_path)
+        except pa.ArrowInvalid as e:
+            if not numeric:
+                raise
+            print(f"⚠️  {csv_name}: {e}; re-reading numeric columns as text and coercing bad cells to null")
+            rows = stream_csv(csv_path, staging, names, declared, tolerant_types, numeric, conn, tmp_path)
+    except Exception as e:
+        conn.execute(f"DROP TABLE IF EXISTS {staging}")
+        conn.commit()
+        tmp_path.unlink(missing_ok=True)
+        print(f"❌ Failed to load {csv_name}, keeping previous '{table_name}': {e}")
+        return None
+
+    conn.execute("BEGIN")
+    conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+    conn.execute(f"ALTER TABLE {staging} RENAME TO {table_name}")
+    conn.commit()
+    os.replace(tmp_path, path)
+    print(f"✅ Loaded {csv_name} -> table '{table_name}' + {path} ({rows} rows)")
+    return path
+
+def save_table(df, table_name, conn):
+    """Write df to SQLite and to data/<table_name>.parquet; returns the Parquet path."""
     df.to_sql(table_name, conn, if_exists="replace", index=False)
-    print(f"✅ Loaded {csv_name} -> table '{table_name}' ({len(df)} rows)")
+    path = parquet_path(table_name)
+    df.to_parquet(path, compression="zstd", index=False)
+    return path
+
+def build_players(paths, conn):
+    """Precompute the sorted player list for the dashboard's player picker."""
+    if paths.get("batting_avg") is None:
+        print("⚠️  Skipping players: batting_avg not loaded")
+        return
+    names = pd.read_parquet(paths["batting_avg"], columns=["Name"])["Name"]
+    players = pd.DataFrame({"Name": sorted(names.dropna().unique())})
+    save_table(players, "players", conn)
+    print(f"✅ Built 'players' ({len(players)} rows)")
+
+def create_indexes(paths, conn):
+    """Index join/filter keys of the tables loaded in this run (import_one's staging swap drops the old table and its indexes)."""
+    for index_name, (table, column) in INDEXES.items():
+        if paths.get(table) is not None:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table}({column})")
+    conn.commit()
 
 def main():
     if not CSV_DIR.exists():
         print(f"CSV directory not found: {CSV_DIR.resolve()}")
         return
     conn = sqlite3.connect(DB_PATH)
+    # bulk-load tuning: WAL journal, fsync only at checkpoints
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
     try:
-        for csv_name, table in REQUIRED.items():
-            import_one(csv_name, table, conn)
+        paths = {table: import_one(csv_name, table, conn) for csv_name, table in REQUIRED.items()}
+        build_players(paths, conn)
+        create_indexes(paths, conn)
         # show tables
         cur = conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
         print("📦 Tables in DB:", [r[0] for r in cur.fetchall()])
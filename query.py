@@ -1,8 +1,21 @@
 import sqlite3
 
+DB_PATH = "baseball.db"
+
+
+def connect():
+    # Open a read-only connection tuned for lookups: pages are memory-mapped
+    # instead of read() per page, and sort/temp structures stay in RAM.
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("PRAGMA query_only = 1")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA mmap_size = 268435456")
+    return conn
+
+
 def get_top_batting_averages():
     # Query and display top 10 highest batting averages.
-    conn = sqlite3.connect("baseball.db")
+    conn = connect()
     cursor = conn.cursor()
     
     query = """
@@ -25,7 +38,7 @@ def get_top_batting_averages():
 
 def get_top_home_runs():
     # Query and display top 10 career home run hitters
-    conn = sqlite3.connect("baseball.db")
+    conn = connect()
     cursor = conn.cursor()
     
     query = """
@@ -48,7 +61,7 @@ def get_top_home_runs():
 
 def get_combined_stats(player_name):
     # Get combined stats for a specific player.
-    conn = sqlite3.connect("baseball.db")
+    conn = connect()
     cursor = conn.cursor()
     
     try:
@@ -76,7 +89,7 @@ def get_combined_stats(player_name):
 
 def get_strikeouts_by_league(league):
     # Return career strikeouts for pitchers in a given league.
-    conn = sqlite3.connect("baseball.db")
+    conn = connect()
     cursor = conn.cursor()
     
     try: